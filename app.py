@@ -1,7 +1,7 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.integrate import odeint
+import pandas as pd
 import streamlit as st
+from model_rhs import rk4_tol
 
 # Configuración inicial de Streamlit
 st.set_page_config(layout="wide")
@@ -11,10 +11,6 @@ Este modelo simula el efecto de diferentes patrones de consumo sobre el cuerpo h
 Selecciona una sustancia para cargar sus parámetros automáticos y modifica la forma de consumo desde el panel lateral.
 """)
 
-# Menú de selección de sustancia
-st.sidebar.markdown("## Sustancia")
-sustancia = st.sidebar.selectbox("Selecciona una sustancia", ["Simulacion General", "Alcohol", "Nicotina", "Marihuana"])
-
 # Valores predeterminados
 parametros = {
     "Simulacion General": {"ke": 0.5, "alpha": 0.3, "beta": 0.1},
@@ -23,111 +19,165 @@ parametros = {
     "Marihuana": {"ke": 0.4, "alpha": 0.25, "beta": 0.1},
 }
 
-# Asignar valores según la sustancia seleccionada
-ke_default = parametros[sustancia]["ke"]
-alpha_default = parametros[sustancia]["alpha"]
-beta_default = parametros[sustancia]["beta"]
-
-# Sliders con unidades
-st.sidebar.markdown("## Parámetros fisiológicos")
-ke = st.sidebar.slider("Tasa de eliminación ke [1/hora]", 0.1, 1.0, ke_default, step=0.05)
-alpha = st.sidebar.slider("Aumento de tolerancia α [1/mg]", 0.0, 1.0, alpha_default, step=0.05)
-beta = st.sidebar.slider("Reducción de tolerancia β [1/hora]", 0.0, 1.0, beta_default, step=0.05)
-
-# Tiempo
-t_max = st.sidebar.slider("Tiempo máximo de simulación [horas]", 10, 100, 50)
-t = np.linspace(0, t_max, 500)
-
-# Funciones de consumo
-def u_singular(t): return 0
-def u_constante(t, R0=1.0): return R0
-def u_lineal(t, a=0.2): return a * t
-def u_periodica(t, D=5, T=5): return D * sum(np.isclose(t, n * T, atol=0.1) for n in range(int(t // T) + 1))
-
-# EDO
-def modelo(y, t, ke, alpha, beta, u_func):
-    C, T = y
-    u_t = u_func(t)
-    dCdt = -ke * C + u_t
-    dTdt = alpha * u_t - beta * T
-    return [dCdt, dTdt]
+# EDO: dC/dt = -ke*C + u(t), dT/dt = alpha*u(t) - beta*T
+# El consumo u(t) se evalúa en model_rhs.u_dispatch, sin funciones Python por paso
 
 # Condiciones iniciales
 y0_singular = [10, 2]
 y0_general = [0, 0]
 
-# Selección de tipo de consumo
-st.sidebar.markdown("## Tipo de consumo")
-tipo = st.sidebar.radio("", ["Dosis única", "Consumo continuo", "Consumo lineal", "Consumo periódico"])
-
-# Configuración adicional según tipo
-if tipo == "Consumo periódico":
-    D = st.sidebar.slider("Dosis por toma [mg]", 1, 10, 5)
-    T_per = st.sidebar.slider("Intervalo entre dosis [horas]", 1, 20, 5)
-    u_func = lambda t: u_periodica(t, D, T_per)
-    y0 = y0_general
-elif tipo == "Consumo continuo":
-    R0 = st.sidebar.slider("Tasa constante de consumo [mg/hora]", 0.1, 5.0, 1.0)
-    u_func = lambda t: u_constante(t, R0)
-    y0 = y0_general
-elif tipo == "Consumo lineal":
-    a = st.sidebar.slider("Incremento de consumo [mg/hora²]", 0.01, 1.0, 0.2)
-    u_func = lambda t: u_lineal(t, a)
-    y0 = y0_general
-else:
-    u_func = u_singular
-    y0 = y0_singular
-
-# Solución del modelo
-sol = odeint(modelo, y0, t, args=(ke, alpha, beta, u_func))
+# Soluciones analíticas de y' = -k*y + u(t), y(0) = 0, para u = 1 y u = t
+def resp_constante(k, t):
+    if k == 0:
+        return t
+    return (1 - np.exp(-k * t)) / k
+
+def resp_lineal(k, t):
+    if k == 0:
+        return t**2 / 2
+    return (t - (1 - np.exp(-k * t)) / k) / k
+
+# Compilación JIT una sola vez por proceso (reutiliza la caché en disco de Numba)
+@st.cache_resource
+def warmup_rk4():
+    # Malla de solo lectura, como la de time_grid, para compilar la misma firma
+    t = np.linspace(0.0, 1.0, 2)
+    t.flags.writeable = False
+    rk4_tol(0.5, 0.3, 0.1, 0.0, 0.0, t, 3, 5.0, 5.0)
+    return True
+
+warmup_rk4()
+
+# Malla temporal compartida entre sesiones: una sola instancia de solo lectura por (t_max, n)
+# 256 puntos bastan para graficar las soluciones analíticas, que son suaves.
+# En el consumo periódico cada dosis es un pulso de 0.2 h (|t - n*T| < 0.1) y el RK4
+# solo ve u(t) en los puntos que muestrea (cada medio paso). Con 500 puntos el paso
+# crecía con t_max y cada pulso quedaba cubierto por 1-2 muestras, así que la dosis
+# integrada variaba según t_max; un paso fijo de 0.05 h cubre cada pulso con 4 pasos
+N_PUNTOS = 256
+PASO_RK4 = 0.05
+
+@st.cache_resource
+def time_grid(t_max, n=N_PUNTOS):
+    t = np.linspace(0.0, float(t_max), n)
+    t.flags.writeable = False
+    return t
+
+# Soluciones del modelo (el cacheo se hace una sola vez, sobre los DataFrames de las gráficas)
+def solve_model(ke, alpha, beta, t_max, tipo, extra):
+    if tipo == "Consumo periódico":
+        D, T_per = extra
+        t = time_grid(t_max, int(round(t_max / PASO_RK4)) + 1)
+        sol = rk4_tol(ke, alpha, beta, float(y0_general[0]), float(y0_general[1]), t, 3, float(D), float(T_per))
+    elif tipo == "Consumo continuo":
+        R0, = extra
+        t = time_grid(t_max)
+        sol = np.column_stack((R0 * resp_constante(ke, t), alpha * R0 * resp_constante(beta, t)))
+    elif tipo == "Consumo lineal":
+        a, = extra
+        t = time_grid(t_max)
+        sol = np.column_stack((a * resp_lineal(ke, t), alpha * a * resp_lineal(beta, t)))
+    else:
+        t = time_grid(t_max)
+        # Sin consumo el sistema es y' = J*y con jacobiano constante J = diag(-ke, -beta)
+        jac = np.array([-ke, -beta])
+        sol = np.asarray(y0_singular, dtype=float) * np.exp(np.outer(t, jac))
+    return t, sol
+
+def solve_comparison(p1, p2, t_max):
+    # Ambas sustancias en un solo sistema 4-D [C1, T1, C2, T2] con u = 1 mg/h
+    # (las tasas de `parametros` son todas positivas)
+    t = time_grid(t_max)
+    k = np.array([p1["ke"], p1["beta"], p2["ke"], p2["beta"]])
+    gain = np.array([1.0, p1["alpha"], 1.0, p2["alpha"]])
+    return gain * -np.expm1(-np.outer(t, k)) / k
+
+# Datos de las gráficas cacheados: Streamlit reutiliza el resultado si los parámetros no cambian
+@st.cache_data(show_spinner=False)
+def main_chart_data(ke, alpha, beta, t_max, tipo, extra):
+    t, sol = solve_model(ke, alpha, beta, t_max, tipo, extra)
+    return pd.DataFrame({"C(t): Sustancia [mg]": sol[:, 0], "T(t): Tolerancia [adimensional]": sol[:, 1]}, index=t)
+
+@st.cache_data(show_spinner=False)
+def comparison_chart_data(sust1, sust2, t_max):
+    sol = solve_comparison(parametros[sust1], parametros[sust2], t_max)
+    return pd.DataFrame({
+        f"C(t) {sust1}": sol[:, 0],
+        f"C(t) {sust2}": sol[:, 2],
+        f"T(t) {sust1}": sol[:, 1],
+        f"T(t) {sust2}": sol[:, 3],
+    }, index=time_grid(t_max))
+
+# Panel lateral: todos los widgets de entrada en un solo bloque
+def sidebar() -> dict:
+    # Menú de selección de sustancia
+    st.sidebar.markdown("## Sustancia")
+    sustancia = st.sidebar.selectbox("Selecciona una sustancia", ["Simulacion General", "Alcohol", "Nicotina", "Marihuana"])
+
+    # Asignar valores según la sustancia seleccionada
+    ke_default = parametros[sustancia]["ke"]
+    alpha_default = parametros[sustancia]["alpha"]
+    beta_default = parametros[sustancia]["beta"]
+
+    # Sliders con unidades
+    st.sidebar.markdown("## Parámetros fisiológicos")
+    ke = st.sidebar.slider("Tasa de eliminación ke [1/hora]", 0.1, 1.0, ke_default, step=0.05)
+    alpha = st.sidebar.slider("Aumento de tolerancia α [1/mg]", 0.0, 1.0, alpha_default, step=0.05)
+    beta = st.sidebar.slider("Reducción de tolerancia β [1/hora]", 0.0, 1.0, beta_default, step=0.05)
+
+    # Tiempo
+    t_max = st.sidebar.slider("Tiempo máximo de simulación [horas]", 10, 100, 50)
+
+    # Selección de tipo de consumo
+    st.sidebar.markdown("## Tipo de consumo")
+    tipo = st.sidebar.radio("", ["Dosis única", "Consumo continuo", "Consumo lineal", "Consumo periódico"])
+
+    # Configuración adicional según tipo
+    if tipo == "Consumo periódico":
+        D = st.sidebar.slider("Dosis por toma [mg]", 1, 10, 5)
+        T_per = st.sidebar.slider("Intervalo entre dosis [horas]", 1, 20, 5)
+        extra = (D, T_per)
+    elif tipo == "Consumo continuo":
+        R0 = st.sidebar.slider("Tasa constante de consumo [mg/hora]", 0.1, 5.0, 1.0)
+        extra = (R0,)
+    elif tipo == "Consumo lineal":
+        a = st.sidebar.slider("Incremento de consumo [mg/hora²]", 0.01, 1.0, 0.2)
+        extra = (a,)
+    else:
+        extra = ()
+
+    return {"sustancia": sustancia, "ke": ke, "alpha": alpha, "beta": beta,
+            "t_max": t_max, "tipo": tipo, "extra": extra}
 
 # Gráfico principal
-st.subheader(f"Simulación para: {sustancia}")
-fig, ax = plt.subplots(figsize=(10, 5))
-ax.plot(t, sol[:, 0], label='C(t): Sustancia [mg]')
-ax.plot(t, sol[:, 1], label='T(t): Tolerancia [adimensional]')
-ax.set_xlabel("Tiempo [horas]")
-ax.set_ylabel("Cantidad")
-ax.set_title(f"Simulación: {tipo}")
-ax.legend()
-ax.grid(True)
-st.pyplot(fig)
-
-# Resultados finales
-st.markdown(f"**C(t_final):** {sol[-1,0]:.2f} mg | **T(t_final):** {sol[-1,1]:.2f} (tolerancia)")
-
-# Sección de comparación
-st.markdown("---")
-st.subheader("Comparativa entre dos sustancias")
-
-# Selección de sustancias para comparar
-col1, col2 = st.columns(2)
-with col1:
-    sust1 = st.selectbox("Sustancia A", ["Alcohol", "Nicotina", "Marihuana"], index=0)
-with col2:
-    sust2 = st.selectbox("Sustancia B", ["Alcohol", "Nicotina", "Marihuana"], index=1)
-
-# Parámetros de ambas sustancias
-p1 = parametros[sust1]
-p2 = parametros[sust2]
-
-# Función de consumo fijo para comparación
-u_comparacion = lambda t: u_constante(t, 1.0)
-y0_comp = [0, 0]
-
-# Solución para ambas
-sol1 = odeint(modelo, y0_comp, t, args=(p1["ke"], p1["alpha"], p1["beta"], u_comparacion))
-sol2 = odeint(modelo, y0_comp, t, args=(p2["ke"], p2["alpha"], p2["beta"], u_comparacion))
-
-# Gráfica comparativa
-fig2, ax2 = plt.subplots(figsize=(10, 5))
-ax2.plot(t, sol1[:, 0], label=f'C(t) {sust1}', linestyle='--')
-ax2.plot(t, sol2[:, 0], label=f'C(t) {sust2}', linestyle='-')
-ax2.plot(t, sol1[:, 1], label=f'T(t) {sust1}', linestyle='--')
-ax2.plot(t, sol2[:, 1], label=f'T(t) {sust2}', linestyle='-')
-ax2.set_xlabel("Tiempo [horas]")
-ax2.set_ylabel("Cantidad")
-ax2.set_title("Comparativa de C(t) y T(t) con consumo constante de 1 mg/h")
-ax2.legend()
-ax2.grid(True)
-st.pyplot(fig2)
+def main_plot(sustancia, ke, alpha, beta, t_max, tipo, extra):
+    df = main_chart_data(ke, alpha, beta, t_max, tipo, extra)
+    st.subheader(f"Simulación para: {sustancia}")
+    st.markdown(f"**Simulación: {tipo}**")
+    st.line_chart(df, x_label="Tiempo [horas]", y_label="Cantidad")
+
+    # Resultados finales
+    C_final, T_final = df.iloc[-1]
+    st.markdown(f"**C(t_final):** {C_final:.2f} mg | **T(t_final):** {T_final:.2f} (tolerancia)")
+
+# Sección de comparación: sus selectores solo vuelven a ejecutar este fragmento
+@st.fragment
+def comparison_plot(t_max):
+    st.markdown("---")
+    st.subheader("Comparativa entre dos sustancias")
+
+    # Selección de sustancias para comparar
+    col1, col2 = st.columns(2)
+    with col1:
+        sust1 = st.selectbox("Sustancia A", ["Alcohol", "Nicotina", "Marihuana"], index=0)
+    with col2:
+        sust2 = st.selectbox("Sustancia B", ["Alcohol", "Nicotina", "Marihuana"], index=1)
+
+    # Gráfica comparativa (consumo constante de 1 mg/h)
+    st.markdown("**Comparativa de C(t) y T(t) con consumo constante de 1 mg/h**")
+    df2 = comparison_chart_data(sust1, sust2, t_max)
+    st.line_chart(df2, x_label="Tiempo [horas]", y_label="Cantidad")
+
+params = sidebar()
+main_plot(**params)
+comparison_plot(params["t_max"])
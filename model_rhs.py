@@ -0,0 +1,39 @@
+import numpy as np
+from numba import njit
+
+# Consumo u(t) sin closures: kind 0=singular, 1=constante, 2=lineal, 3=periódico
+@njit(cache=True, fastmath=True)
+def u_dispatch(t, kind, p0, p1):
+    if kind == 1:
+        return p0
+    elif kind == 2:
+        return p0 * t
+    elif kind == 3:
+        r = t - np.floor(t / p1 + 0.5) * p1
+        return p0 if abs(r) < 0.1 else 0.0
+    return 0.0
+
+# Integrador RK4 de paso fijo compilado con Numba
+@njit(cache=True, fastmath=True)
+def rk4_tol(ke, alpha, beta, C0, T0, t, kind, p0, p1):
+    sol = np.empty((len(t), 2))
+    C, T = C0, T0
+    sol[0, 0], sol[0, 1] = C, T
+    for i in range(len(t) - 1):
+        h = t[i + 1] - t[i]
+        ti = t[i]
+        u1 = u_dispatch(ti, kind, p0, p1)
+        u2 = u_dispatch(ti + 0.5 * h, kind, p0, p1)
+        u3 = u_dispatch(ti + h, kind, p0, p1)
+        k1C = -ke * C + u1
+        k1T = alpha * u1 - beta * T
+        k2C = -ke * (C + 0.5 * h * k1C) + u2
+        k2T = alpha * u2 - beta * (T + 0.5 * h * k1T)
+        k3C = -ke * (C + 0.5 * h * k2C) + u2
+        k3T = alpha * u2 - beta * (T + 0.5 * h * k2T)
+        k4C = -ke * (C + h * k3C) + u3
+        k4T = alpha * u3 - beta * (T + h * k3T)
+        C += h / 6.0 * (k1C + 2.0 * k2C + 2.0 * k3C + k4C)
+        T += h / 6.0 * (k1T + 2.0 * k2T + 2.0 * k3T + k4T)
+        sol[i + 1, 0], sol[i + 1, 1] = C, T
+    return sol